@@ -5,7 +5,6 @@ import pandas as pd
 from InquirerPy import inquirer
 from InquirerPy.base.control import Choice
 from letterboxd_stats import config
-from ascii_magic import AsciiArt
 from datetime import datetime
 
 IMAGE_URL = "https://www.themoviedb.org/t/p/w600_and_h900_bestv2"
@@ -76,11 +75,11 @@ def print_film(film: dict, expand=True):
 
 
 def render_table(df: pd.DataFrame, name: str):
-    df_str = df.astype(str)
+    columns = [df[col].astype(str).tolist() for col in df.columns]
     table = Table(title=name, box=box.SIMPLE)
-    for col in df_str.columns:
-        table.add_column(col)
-    for _, row in df_str.iterrows():
+    for col in df.columns.tolist():
+        table.add_column(str(col))
+    for row in zip(*columns):
         table.add_row(*row)
     console = Console()
     console.print(table)
@@ -88,6 +87,8 @@ def render_table(df: pd.DataFrame, name: str):
 
 def download_poster(poster: str):
     if config["CLI"]["poster_columns"] > 0:
+        from ascii_magic import AsciiArt
+
         art = AsciiArt.from_url(IMAGE_URL + poster)
         art.to_terminal(columns=int(config["CLI"]["poster_columns"]))
 
@@ -1,47 +1,38 @@
 import pandas as pd
-from pandarallel import pandarallel
 import numpy as np
 from letterboxd_stats import cli
-from letterboxd_stats.web_scraper import get_tmdb_id
+from letterboxd_stats.web_scraper import get_tmdb_ids
 from letterboxd_stats import tmdb
 import os
+import csv
 from letterboxd_stats import config
-from tqdm import tqdm
 
-tqdm.pandas(desc="Fetching ids...")
-pandarallel.initialize(progress_bar=False, verbose=1)
 
-
-def check_if_watched(df: pd.DataFrame, row: pd.Series) -> bool:
+def get_watched_tmdb_ids(df: pd.DataFrame, df_profile: pd.DataFrame) -> list[int]:
     """watched.csv hasn't the TMDB id, so comparison can be done only by title.
     This creates the risk of mismatch when two films have the same title. To avoid this,
-    we must retrieve the TMDB id of the watched film.
+    we must retrieve the TMDB id of the watched films whose title matches one of the films in df.
+    Each Letterboxd URI is resolved only once, and the uncached ones concurrently.
     """
 
-    if row["Title"] in df["Name"].values:
-        watched_films_same_name = df[df["Name"] == row["Title"]]
-        for _, film in watched_films_same_name.iterrows():
-            film_id = get_tmdb_id(film["Letterboxd URI"])
-            if film_id == row.name:
-                return True
-    return False
+    candidates = df.reset_index(names="Id").merge(
+        df_profile[["Name", "Letterboxd URI"]], left_on="Title", right_on="Name", how="inner"
+    )
+    uri_to_id = get_tmdb_ids(candidates["Letterboxd URI"].tolist())
+    candidates["TMDB Id"] = candidates["Letterboxd URI"].map(uri_to_id)
+    return candidates.loc[candidates["TMDB Id"] == candidates["Id"], "Id"].tolist()
 
 
 def read_watched_films(df: pd.DataFrame, path: str, name: str) -> pd.DataFrame:
     """Check which film of a director you have seen. Add a column to show on the CLI."""
 
-    df_profile = pd.read_csv(path)
-    df.insert(
-        0,
-        "watched",
-        np.where(
-            [check_if_watched(df_profile, row) for _, row in df.iterrows()],
-            "[X]",
-            "[ ]",
-        ),
-    )
-    df["Release Date"] = pd.to_datetime(df["Release Date"])
-    df.sort_values(by="Release Date", inplace=True)
+    df_profile = pd.read_csv(path, usecols=["Name", "Letterboxd URI"])
+    watched_ids = get_watched_tmdb_ids(df, df_profile)
+    watched = df.index.isin(watched_ids).astype(np.int8)
+    df.insert(0, "watched", pd.Categorical.from_codes(watched, categories=["[ ]", "[X]"]))
+    # Show a malformed TMDB release date as missing instead of failing the whole search.
+    df["Release Date"] = pd.to_datetime(df["Release Date"], format="%Y-%m-%d", errors="coerce")
+    df.sort_values(by="Release Date", inplace=True, kind="mergesort")
     cli.render_table(df, name)
     return df
 
@@ -55,8 +46,14 @@ def select_film_of_person(df: pd.DataFrame) -> pd.Series | None:
 
 
 def get_list_name(path: str) -> str:
-    df = pd.read_csv(path, header=1)
-    return df["Name"].iloc[0]
+    """The list name is in the metadata section at the top of the file, so there's no need to parse the films."""
+
+    with open(path, newline="", encoding="utf-8") as f:
+        next(f, None)  # Skip the export version line.
+        list_info = next(csv.DictReader(f), None)
+    if list_info is None or not list_info.get("Name"):
+        raise ValueError(f"No list name found in {path}. The file may be empty or truncated.")
+    return list_info["Name"]
 
 
 def open_list(path: str, limit: int, ascending: bool) -> str:
@@ -88,7 +85,7 @@ def open_file(filetype: str, path: str, limit, ascending, header=0) -> str:
 
 def _show_lists(df: pd.DataFrame, ascending: bool) -> pd.DataFrame:
     ratings_path = os.path.expanduser(os.path.join(config["root_folder"], "static", "ratings.csv"))
-    df_ratings = pd.read_csv(ratings_path)
+    df_ratings = pd.read_csv(ratings_path, usecols=["Letterboxd URI", "Rating"])
     df_ratings.rename(columns={"Letterboxd URI": "URL"}, inplace=True)
     df = df.merge(df_ratings[["URL", "Rating"]], on="URL", how="inner")
     df.rename(columns={"URL": "Url"}, inplace=True)
@@ -98,8 +95,8 @@ def _show_lists(df: pd.DataFrame, ascending: bool) -> pd.DataFrame:
     df.sort_values(by=sort_column, ascending=ascending, inplace=True)
     avg = {"Rating Mean": "{:.2f}".format(df["Rating"].mean())}
     if config["TMDB"]["get_list_runtimes"] is True:
-        ids = df["Url"].parallel_map(get_tmdb_id)
-        df["Duration"] = ids.parallel_map(lambda id: tmdb.get_movie_duration(id))  # type: ignore
+        ids = df["Url"].map(get_tmdb_ids(df["Url"].tolist()))
+        df["Duration"] = tmdb.get_movie_durations(ids)
         avg["Time-weighted Rating Mean"] = "{:.2f}".format(
             ((df["Duration"] / df["Duration"].sum()) * df["Rating"]).sum()
         )
@@ -120,7 +117,7 @@ def _show_watchlist(df: pd.DataFrame, ascending: bool) -> pd.DataFrame:
 
 
 def _show_diary(df: pd.DataFrame, ascending: bool) -> pd.DataFrame:
-    df["Watched Date"] = pd.to_datetime(df["Watched Date"])
+    df["Watched Date"] = pd.to_datetime(df["Watched Date"], format="%Y-%m-%d")
     sort_column = cli.select_value(df.columns.values.tolist(), "Select the order of your diary entries:")
     df.sort_values(by=sort_column, ascending=ascending, inplace=True)
     df = df.drop(["Rewatch", "Tags"], axis=1)
@@ -128,7 +125,7 @@ def _show_diary(df: pd.DataFrame, ascending: bool) -> pd.DataFrame:
 
 
 def _show_ratings(df: pd.DataFrame, ascending: bool) -> pd.DataFrame:
-    df["Date"] = pd.to_datetime(df["Date"])
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d")
     sort_column = cli.select_value(df.columns.values.tolist(), "Select the order of your ratings:")
     df.sort_values(by=sort_column, ascending=ascending, inplace=True)
     if sort_column == "Rating":
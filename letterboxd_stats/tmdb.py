@@ -1,18 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
 from typing import Any, Tuple
 from tmdbv3api import TMDb, Person, Movie, Search
 from tmdbv3api.exceptions import TMDbException
 import pandas as pd
-from pandarallel import pandarallel
 from tmdbv3api.objs.account import AsObj
 from letterboxd_stats import cli
 from letterboxd_stats import config
 
 tmdb = TMDb()
 tmdb.api_key = config["TMDB"]["api_key"]
-person = Person()
-movie = Movie()
-search = Search()
-pandarallel.initialize(progress_bar=False, verbose=1)
+
+
+# The TMDB api objects are created on first use, since not every command talks to TMDB.
+@cache
+def _person() -> Person:
+    return Person()
+
+
+@cache
+def _movie() -> Movie:
+    return Movie()
+
+
+@cache
+def _search() -> Search:
+    return Search()
+
+
+_parallel_initialized = False
+
+
+def _ensure_parallel():
+    """pandarallel starts its workers on initialization, so do it only when a parallel map is actually needed."""
+
+    global _parallel_initialized
+    if not _parallel_initialized:
+        from pandarallel import pandarallel
+
+        pandarallel.initialize(progress_bar=False, verbose=1)
+        _parallel_initialized = True
 
 
 def get_person(name: str) -> Tuple[pd.DataFrame, str]:
@@ -22,42 +49,44 @@ def get_person(name: str) -> Tuple[pd.DataFrame, str]:
     """
 
     print(f"Searching for '{name}'")
-    search_results = search.people({"query": name})
+    search_results = _search().people({"query": name})
     names = [result.name for result in search_results]  # type: ignore
     if len(names) == 0:
         raise Exception("No results found for your TMDB person search.")
     result_index = cli.select_search_result(names)  # type: ignore
     search_result = search_results[result_index]
-    p = person.details(search_result["id"])
+    # Details and credits only depend on the person id, so request them at the same time.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        details = executor.submit(_person().details, search_result["id"])
+        credits = executor.submit(_person().movie_credits, search_result["id"])
+        p, movie_credits = details.result(), credits.result()
     known_for_department = p["known_for_department"]
-    movie_credits = person.movie_credits(search_result["id"])
-    list_of_movies = [
-        {
-            "Id": m.id,
-            "Title": m.title,
-            "Release Date": m.release_date,
-            "Department": m.department,
-        }
-        for m in movie_credits["crew"]
-    ]
-    if len(list_of_movies) == 0:
+    crew = movie_credits["crew"]
+    if len(crew) == 0:
         raise ValueError("The selected person doesn't have any film.")
-    df = pd.DataFrame(list_of_movies).set_index("Id")
+    df = pd.DataFrame(
+        {
+            "Title": [m.title for m in crew],
+            "Release Date": [m.release_date for m in crew],
+            "Department": pd.Categorical([m.department for m in crew]),
+        },
+        index=pd.Index([m.id for m in crew], name="Id"),
+    )
     department = cli.select_value(
-        df["Department"].unique(), f"Select a department for {p['name']}", known_for_department
+        df["Department"].unique().tolist(), f"Select a department for {p['name']}", known_for_department
     )
     df = df[df["Department"] == department]
     df = df.drop("Department", axis=1)
     # person.details provides movies without time duration. If the user wants<S-D-A>
     # (since this slows down the process) get with the movie.details API.
     if config["TMDB"]["get_list_runtimes"] is True:
-        df["Duration"] = df.index.to_series().parallel_map(get_movie_duration)  # type: ignore
+        df["Duration"] = get_movie_durations(df.index.to_series())
     return df, p["name"]
 
 
 def get_movie(movie_query: str) -> Any | AsObj:
     print(f"Searching for movie '{movie_query}'")
-    search_results = search.movies({"query": movie_query})
+    search_results = _search().movies({"query": movie_query})
     titles = [f"{result.title} ({result.release_date})" for result in search_results]  # type: ignore
     if len(titles) == 0:
         raise Exception("No results found for your TMDB movie search.")
@@ -68,7 +97,7 @@ def get_movie(movie_query: str) -> Any | AsObj:
 
 
 def get_movie_detail(movie_id: int, letterboxd_url=None):
-    movie_details = movie.details(movie_id)
+    movie_details = _movie().details(movie_id)
     poster = movie_details.get("poster_path")
     if poster is not None:
         cli.download_poster(poster)
@@ -90,7 +119,14 @@ def get_movie_duration(tmdb_id: int) -> int:
     """
 
     try:
-        runtime = movie.details(tmdb_id).runtime  # type: ignore
+        runtime = _movie().details(tmdb_id).runtime  # type: ignore
     except TMDbException:
         runtime = 0
     return runtime
+
+
+def get_movie_durations(tmdb_ids: pd.Series) -> pd.Series:
+    """Get the duration of many movies, calling the TMDB api in parallel."""
+
+    _ensure_parallel()
+    return tmdb_ids.parallel_map(get_movie_duration)  # type: ignore
@@ -1,44 +1,76 @@
 import os
+from functools import cached_property
 from zipfile import ZipFile
 from letterboxd_stats import config
 from letterboxd_stats import cli
 import requests
+from requests.adapters import HTTPAdapter
 from lxml import html
 import shelve
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
 
 URL = "https://letterboxd.com"
 LOGIN_PAGE = URL + "/user/login.do"
 DATA_PAGE = URL + "/data/export"
 ADD_DIARY_URL = URL + "/s/save-diary-entry"
+CSRF_COOKIE = "com.xk72.webparts.csrf"
 FILM_OPERATIONS = {
     "Add to diary": "add_diary_entry",
     "Add to watchlist": "add_watchlist_entry",
     "Remove from watchlist": "remove_watchlist_entry",
 }
+# Operations that need no user input, so that they can be sent in bulk.
+BULK_FILM_OPERATIONS = ["Add to watchlist", "Remove from watchlist"]
 OPERATIONS_URLS = {
-    "search": lambda s: f"/s/search/{s}/",
-    "diary": lambda s: f"/csi/film/{s}/sidebar-user-actions/?esiAllowUser=true",
-    "add_watchlist": lambda s: f"/film/{s}/add-to-watchlist/",
-    "remove_watchlist": lambda s: f"/film/{s}/remove-from-watchlist/",
-    "film_page": lambda s: f"/film/{s}",
+    "search": URL + "/s/search/{}/",
+    "diary": URL + "/csi/film/{}/sidebar-user-actions/?esiAllowUser=true",
+    "add_watchlist": URL + "/film/{}/add-to-watchlist/",
+    "remove_watchlist": URL + "/film/{}/remove-from-watchlist/",
+    "film_page": URL + "/film/{}",
 }
 
+# Scraping TMDB ids is bound by Letterboxd response time, so pages are fetched concurrently.
+MAX_WORKERS = 16
+
 cache_path = os.path.expanduser(os.path.join(config["root_folder"], "static", "cache.db"))
 
+# Shared by the public (not logged in) requests, so that connections are reused across threads.
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
 
 class Connector:
     def __init__(self):
         self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=16))
         # get home page to set cookies in the session.
         self.session.get(URL)
 
+    @cached_property
+    def csrf_token(self) -> str | None:
+        """Read once from the cookies, and again only after login or when Letterboxd rejects it."""
+
+        return self.session.cookies.get(CSRF_COOKIE)
+
+    def _reset_csrf_token(self):
+        self.__dict__.pop("csrf_token", None)
+
+    def _post_with_csrf(self, url: str, data: dict) -> requests.Response:
+        res = self.session.post(url, data={**data, "__csrf": self.csrf_token})
+        if res.status_code == 403:
+            # The token was rotated: read the new one from the cookies and try once more.
+            self._reset_csrf_token()
+            res = self.session.post(url, data={**data, "__csrf": self.csrf_token})
+        return res
+
     def login(self):
         request_payload = {
             "username": config["Letterboxd"]["username"],
             "password": config["Letterboxd"]["password"],
-            "__csrf": self.session.cookies.get("com.xk72.webparts.csrf"),
         }
-        res = self.session.post(LOGIN_PAGE, data=request_payload)
+        res = self._post_with_csrf(LOGIN_PAGE, request_payload)
+        self._reset_csrf_token()
         if res.json()["result"] != "success":
             raise ConnectionError("Failed to login")
 
@@ -61,33 +93,36 @@ class Connector:
             zip.extractall(path)
         os.remove(archive)
 
-    def add_diary_entry(self, title: str):
-        payload = cli.get_input_add_diary_entry()
+    def get_lb_film_id(self, title: str) -> str:
+        """Not the TMDB id, but the Letterboxd ID to use to add the film to diary.
+        Reference: https://letterboxd.com/film/seven-samurai/
+        """
+
         url = create_lb_url(title, "diary")
         res = self.session.get(url)
         if res.status_code != 200:
             raise ConnectionError("Failed to retrieve the Letterboxd page")
         film_page = html.fromstring(res.text)
-        # Not the TMDB id, but the Letterboxd ID to use to add the film to diary.
-        # Reference: https://letterboxd.com/film/seven-samurai/
-        letterboxd_film_id = film_page.get_element_by_id("frm-sidebar-rating").get("data-rateable-uid").split(":", 1)[1]
-        payload["filmId"] = letterboxd_film_id
-        payload["__csrf"] = self.session.cookies.get("com.xk72.webparts.csrf")
-        res = self.session.post(ADD_DIARY_URL, data=payload)
+        return film_page.get_element_by_id("frm-sidebar-rating").get("data-rateable-uid").split(":", 1)[1]
+
+    def add_diary_entry(self, title: str):
+        payload = cli.get_input_add_diary_entry()
+        payload["filmId"] = self.get_lb_film_id(title)
+        res = self._post_with_csrf(ADD_DIARY_URL, payload)
         if not (res.status_code == 200 and res.json()["result"] is True):
             raise ConnectionError(f"Failed to add to diary.")
         print(f"{title} was added to your diary.")
 
     def add_watchlist_entry(self, title: str):
         url = create_lb_url(title, "add_watchlist")
-        res = self.session.post(url, data={"__csrf": self.session.cookies.get("com.xk72.webparts.csrf")})
+        res = self._post_with_csrf(url, {})
         if not (res.status_code == 200 and res.json()["result"] is True):
             raise ConnectionError("Failed to add to watchlist.")
         print(f"{title} was added to your watchlist.")
 
     def remove_watchlist_entry(self, title: str):
         url = create_lb_url(title, "remove_watchlist")
-        res = self.session.post(url, data={"__csrf": self.session.cookies.get("com.xk72.webparts.csrf")})
+        res = self._post_with_csrf(url, {})
         if not (res.status_code == 200 and res.json()["result"] is True):
             raise ConnectionError("Failed to remove from watchlist.")
         print(f"{title} was removed from your watchlist.")
@@ -97,9 +132,31 @@ class Connector:
 
         getattr(self, FILM_OPERATIONS[operation])(link)
 
+    def bulk_perform_operations(self, operations: list[tuple[str, str]]) -> list[Exception | None]:
+        """Perform many (operation, link) pairs at once, e.g. to add a whole list of films to the watchlist.
+        The requests are sent concurrently and share the connector's cached CSRF token.
+        Return, for each operation, the exception it raised or None if it succeeded.
+        """
+
+        for operation, _ in operations:
+            if operation not in BULK_FILM_OPERATIONS:
+                raise ValueError(f"Operation '{operation}' can't be performed in bulk.")
+
+        def perform(operation_link: tuple[str, str]) -> Exception | None:
+            operation, link = operation_link
+            try:
+                getattr(self, FILM_OPERATIONS[operation])(link)
+            except Exception as e:
+                return e
+            return None
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return list(executor.map(perform, operations))
+
 
 def create_lb_url(title: str, operation: str) -> str:
-    return URL + OPERATIONS_URLS[operation](title)
+    return OPERATIONS_URLS[operation].format(title)
+
 
 
 def _get_tmdb_id_from_web(link: str, is_diary: bool) -> int:
@@ -107,7 +164,9 @@ def _get_tmdb_id_from_web(link: str, is_diary: bool) -> int:
     Inspect this HTML for reference: https://letterboxd.com/film/seven-samurai/
     """
 
-    res = requests.get(link)
+    res = session.get(link)
+    # Make throttling (e.g. 429 under concurrent scraping) a request error, not a page without TMDB link.
+    res.raise_for_status()
     movie_page = html.fromstring(res.text)
     # Diary links sends you to a different page with no link to TMDB. Redirect to the actual page.
     if is_diary:
@@ -116,7 +175,9 @@ def _get_tmdb_id_from_web(link: str, is_diary: bool) -> int:
             raise ValueError("No movie link found.")
         movie_link = title_link[0]
         movie_url = URL + movie_link.get("href")
-        movie_page = html.fromstring(requests.get(movie_url).text)
+        res = session.get(movie_url)
+        res.raise_for_status()
+        movie_page = html.fromstring(res.text)
     tmdb_link = movie_page.xpath("//a[@data-track-action='TMDB']")
     if len(tmdb_link) == 0:
         raise ValueError("No link found for film")
@@ -132,28 +193,67 @@ def _get_tmdb_id_from_web(link: str, is_diary: bool) -> int:
 
 
 def get_tmdb_id(link: str, is_diary=False) -> int | None:
-    """Find the TMDB id from a letterboxd page.
+    """Find the TMDB id from a letterboxd page."""
+
+    return get_tmdb_ids([link], is_diary)[link]
+
+
+def _fetch_tmdb_id(link: str, is_diary: bool) -> int | None:
+    # Runs on the worker threads while the progress bar is drawn, so messages go through tqdm.
+    try:
+        return _get_tmdb_id_from_web(link, is_diary)
+    except ValueError as e:
+        tqdm.write(str(e))
+    except requests.RequestException as e:
+        # Not cached, so the link is retried on the next run.
+        tqdm.write(f"Failed to retrieve {link}: {e}")
+    return None
+
+
+def get_tmdb_ids(links: list[str], is_diary=False) -> dict[str, int | None]:
+    """Find the TMDB ids of many Letterboxd pages at once.
 
     A link to a Letterboxd film usually starts with either https://letterboxd.com/
     or https://boxd.it/ (usually all .csv files have this prefix). We structure the cache dict accordingly.
     The cache is meant to avoid bottleneck of constantly retrieving the Id from an HTML page.
+    Each prefix dict is loaded from the cache and written back at most once per call.
+    Links missing from the cache are scraped concurrently, while the cache is only used from the calling thread.
     """
 
-    tmdb_id_cache = shelve.open(cache_path, writeback=False, protocol=5)
-    prefix, key = link.rsplit("/", 1)
-    if prefix in tmdb_id_cache and key in tmdb_id_cache[prefix]:
-        id = tmdb_id_cache[prefix][key]
-    else:
+    with shelve.open(cache_path, writeback=False, protocol=5) as tmdb_id_cache:
+        prefix_dicts: dict[str, dict[str, int]] = {}
+        ids = {}
+        missing_links = []
+        for link in dict.fromkeys(links):
+            prefix, key = link.rsplit("/", 1)
+            if prefix not in prefix_dicts:
+                prefix_dicts[prefix] = tmdb_id_cache.get(prefix) or {}
+            if key in prefix_dicts[prefix]:
+                ids[link] = prefix_dicts[prefix][key]
+            else:
+                missing_links.append(link)
+        fetched_ids = []
         try:
-            id = _get_tmdb_id_from_web(link, is_diary)
-            prefix_dict = tmdb_id_cache.get(prefix) or {}
-            prefix_dict[key] = id
-            tmdb_id_cache[prefix] = prefix_dict
-        except ValueError as e:
-            print(e)
-            id = None
-    tmdb_id_cache.close()
-    return id
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                for id in tqdm(
+                    executor.map(lambda link: _fetch_tmdb_id(link, is_diary), missing_links),
+                    total=len(missing_links),
+                    desc="Fetching ids...",
+                    disable=len(missing_links) <= 1,
+                ):
+                    fetched_ids.append(id)
+        finally:
+            # Save the ids scraped so far even if a link failed unexpectedly.
+            updated_prefixes = set()
+            for link, id in zip(missing_links, fetched_ids):
+                ids[link] = id
+                if id is not None:
+                    prefix, key = link.rsplit("/", 1)
+                    prefix_dicts[prefix][key] = id
+                    updated_prefixes.add(prefix)
+            for prefix in updated_prefixes:
+                tmdb_id_cache[prefix] = prefix_dicts[prefix]
+    return ids
 
 
 def select_optional_operation() -> str:
@@ -167,7 +267,7 @@ def get_lb_title(title: str, allow_selection=False) -> str:
 
     search_url = create_lb_url(title, "search")
     print(f"Searching for '{title}'")
-    res = requests.get(search_url)
+    res = session.get(search_url)
     if res.status_code != 200:
         raise ConnectionError("Failed to retrieve the Letterboxd page.")
     search_page = html.fromstring(res.text)